@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from findus.credentials import PlantNetCredentials
+from findus.sampling.crop_photo_sampling import CropPhotoSamples
+from findus.sampling.field_sampling import FieldSamples
+
+from synthetic import (TILE_CRS, classified_sample_points, create_geotagged_jpegs, create_segments_raster,
+                       tile_bounds)
+
+NUM_PHOTOS = [10, 100]
+NUM_FIELD_SAMPLES = [10, 100, 1000]
+SEGMENTS_SIZE = 1024
+
+
+@pytest.fixture(scope='module', params=NUM_PHOTOS, ids=lambda n: 'photos{}'.format(n))
+def photo_directory(request, tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp('photos'))
+    create_geotagged_jpegs(directory, num_photos=request.param, bounds=tile_bounds(SEGMENTS_SIZE))
+    return directory
+
+
+@pytest.fixture(scope='module')
+def segments_path(tmp_path_factory):
+    return create_segments_raster(os.path.join(str(tmp_path_factory.mktemp('segments')), 'segments.tif'),
+                                  size=SEGMENTS_SIZE)
+
+
+def test_crop_photo_samples_add_samples(measure, photo_directory):
+    measure(lambda: CropPhotoSamples().add_samples(photo_directory=photo_directory))
+
+
+def test_classify_samples(measure, photo_directory, local_plantnet):
+    def unclassified_samples():
+        return CropPhotoSamples(plant_net_credentials=PlantNetCredentials(key='benchmark')).add_samples(
+            photo_directory=photo_directory)
+
+    measure(lambda samples: samples.classify_samples(), setup=unclassified_samples)
+
+
+@pytest.mark.parametrize('num_samples', NUM_FIELD_SAMPLES, ids=lambda n: 'samples{}'.format(n))
+def test_field_samples_add_samples(measure, segments_path, num_samples):
+    crop_photo_samples = CropPhotoSamples(crs=TILE_CRS)
+    crop_photo_samples.samples = classified_sample_points(num_samples, size=SEGMENTS_SIZE)
+
+    measure(lambda: FieldSamples(crs=TILE_CRS).add_samples(crop_photo_samples=crop_photo_samples,
+                                                           path_segments=segments_path,
+                                                           minimum_classification_score=0.3))
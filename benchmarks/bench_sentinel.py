@@ -0,0 +1,33 @@
+import copy
+
+import numpy as np
+
+
+def test_process_raw_product(measure, single_product_aoi):
+    measure(lambda: single_product_aoi.process_raw_product(single_product_aoi.raw_data_paths[0]))
+
+
+def test_combine_processed_products(measure, processed_aoi):
+    measure(lambda: processed_aoi.combine_processed_products(combination_function=np.nanmean))
+
+
+def test_perform_image_segmentation(measure, processed_single_product_aoi):
+    # Segmentation only depends on the size of the combined image, not on the number of products.
+    aoi = processed_single_product_aoi
+    aoi.combine_processed_products()
+    combined_imgs = aoi.combined_imgs
+
+    def reset():
+        # Segmentation modifies the combined images in place.
+        aoi.combined_imgs = copy.deepcopy(combined_imgs)
+
+    measure(lambda _: aoi.perform_image_segmentation(n_segments=500, band='B02'), setup=reset)
+
+
+def test_datacube_iter_chunks(measure, processed_aoi):
+    def read_all():
+        with processed_aoi.build_datacube(chunk_size=(256, 256)) as datacube:
+            for _ in datacube.iter_chunks():
+                pass
+
+    measure(read_all)
@@ -0,0 +1,103 @@
+import os
+import tracemalloc
+
+import pytest
+
+import findus.plantnet
+from findus.credentials import CopernicusCredentials
+from findus.sentinel import AOI
+from shapely.geometry import box
+
+from plantnet_stub import PlantNetStub
+from synthetic import create_safe_products, tile_bounds
+
+# Saved runs are machine specific and therefore not tracked by git.
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.results')
+
+# Edge length of the synthetic tiles in 10m pixels and number of products per AOI.
+TILE_SIZES = [256, 1024]
+NUM_PRODUCTS = [1, 4]
+
+
+def pytest_configure(config):
+    # Store results independent of the working directory unless a storage is passed explicitly.
+    if config.getoption('benchmark_storage') == 'file://./.benchmarks':
+        config.option.benchmark_storage = 'file://' + RESULTS_DIRECTORY
+
+
+@pytest.fixture
+def measure(benchmark):
+    """Benchmark a function and record its peak Python memory usage.
+
+    The function is timed with benchmark.pedantic(), calling setup before every round so
+    that stateful methods always start from the same state. The peak memory (in MB) of one
+    additional run traced by tracemalloc is stored in the benchmark's extra_info, which
+    ends up in the saved benchmark results. Memory allocated by GDAL is not covered.
+    """
+    def run(function, setup=None, rounds=3):
+        def prepare():
+            return (setup(),) if setup is not None else ()
+
+        args = prepare()
+        tracemalloc.start()
+        try:
+            function(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info['peak_memory_mb'] = peak / 2 ** 20
+
+        return benchmark.pedantic(function, setup=lambda: (prepare(), {}), rounds=rounds, iterations=1)
+    return run
+
+
+@pytest.fixture(scope='session')
+def plantnet_stub():
+    with PlantNetStub() as stub:
+        yield stub
+
+
+@pytest.fixture
+def local_plantnet(plantnet_stub, monkeypatch):
+    monkeypatch.setattr(findus.plantnet, 'PLANTNET_API_URL', plantnet_stub.url)
+    return plantnet_stub
+
+
+def create_aoi(base_directory, size, num_products):
+    credentials = CopernicusCredentials()
+    credentials.username, credentials.password = 'benchmark', 'benchmark'
+    aoi = AOI(bounds=box(*tile_bounds(size)),
+              name='Benchmark',
+              base_directory=base_directory,
+              copernicus_credentials=credentials)
+    create_safe_products(aoi.raw_data_directory, num_products=num_products, size=size)
+    aoi.raw_data_paths = [os.path.join(aoi.raw_data_directory, p) for p in sorted(os.listdir(aoi.raw_data_directory))]
+    return aoi
+
+
+@pytest.fixture(scope='module', params=TILE_SIZES, ids=lambda s: 'size{}'.format(s))
+def single_product_aoi(request, tmp_path_factory):
+    """AOI with one synthetic raw product."""
+    return create_aoi(str(tmp_path_factory.mktemp('aoi')), request.param, 1)
+
+
+@pytest.fixture(scope='module', params=[(s, n) for s in TILE_SIZES for n in NUM_PRODUCTS],
+                ids=lambda p: 'size{}-products{}'.format(*p))
+def raw_aoi(request, tmp_path_factory):
+    """AOI with synthetic raw products."""
+    size, num_products = request.param
+    return create_aoi(str(tmp_path_factory.mktemp('aoi')), size, num_products)
+
+
+@pytest.fixture(scope='module')
+def processed_single_product_aoi(single_product_aoi):
+    """AOI with one synthetic raw and processed product."""
+    single_product_aoi.start_raw_product_processing()
+    return single_product_aoi
+
+
+@pytest.fixture(scope='module')
+def processed_aoi(raw_aoi):
+    """AOI with synthetic raw and processed products."""
+    raw_aoi.start_raw_product_processing()
+    return raw_aoi
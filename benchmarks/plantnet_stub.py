@@ -0,0 +1,43 @@
+"""Local stand-in for the PlantNet identification API."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SPECIES = ['Zea mays', 'Triticum aestivum', 'Brassica napus']
+
+
+class PlantNetStubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        # Consume the uploaded image like the real API does.
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        results = [{'score': score, 'species': {'scientificNameWithoutAuthor': name}}
+                   for name, score in zip(SPECIES, [0.8, 0.15, 0.05])]
+        body = json.dumps({'results': results}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PlantNetStub:
+    """PlantNet API stub served from a background thread on localhost."""
+    def __init__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), PlantNetStubHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return 'http://{}:{}/v2/identify/all'.format(host, port)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,189 @@
+"""Generators for synthetic benchmark fixtures.
+
+The generated data mimics the structure findus expects from real inputs (Sentinel 2 L2A
+SAFE products, geotagged smartphone photos, segmentation rasters) but is fully
+reproducible from a random seed.
+"""
+import datetime
+import os
+
+import numpy as np
+import geopandas as gpd
+import rasterio
+from PIL import Image
+from PIL.ExifTags import GPSTAGS
+from PIL.TiffImagePlugin import IFDRational
+from rasterio.transform import from_origin
+from shapely.geometry import Point
+
+from findus.sentinel import Sentinel2Specs
+
+TILE_ID = 'T32UNA'
+TILE_CRS = 'EPSG:32632'
+TILE_ORIGIN = (600000, 5400000)
+
+# Scene classification classes: 4 vegetation, 5 bare soil, 8/9 clouds, 3 cloud shadow.
+SCENE_CLASSES = [4, 5, 8, 9, 3]
+SCENE_CLASS_PROBABILITIES = [0.55, 0.25, 0.08, 0.07, 0.05]
+
+GPS_TAGS = {name: key for key, name in GPSTAGS.items()}
+
+
+def field_pattern(height, width, field_size, rng):
+    """Create an image of rectangular fields with one random id per field."""
+    rows = np.arange(height) // field_size
+    cols = np.arange(width) // field_size
+    field_ids = rows[:, None] * (width // field_size + 1) + cols[None, :]
+    return rng.permutation(field_ids.max() + 1)[field_ids]
+
+
+def create_safe_product(raw_directory,
+                        sensing_time,
+                        size=512,
+                        bands=['B02', 'B03', 'B04', 'B08', 'B11', 'SCL'],
+                        field_size=32,
+                        seed=0):
+    """Create a synthetic Sentinel 2 L2A product in SAFE format.
+
+    Parameters
+    ----------
+    raw_directory: str
+        Directory the product is written to, usually AOI.raw_data_directory.
+    sensing_time: datetime.datetime
+        Sensing time encoded in the product name.
+    size: int
+        Height and width of the 10m bands in pixels. 20m bands have half the size.
+    bands: List[str]
+        Bands to be written.
+    field_size: int
+        Edge length of the synthetic fields in 10m pixels.
+    seed: int
+        Random seed.
+
+    Returns
+    -------
+    str
+        Path of the created .SAFE directory.
+    """
+    rng = np.random.default_rng(seed)
+    stamp = sensing_time.strftime('%Y%m%dT%H%M%S')
+    product_name = 'S2A_MSIL2A_{}_N0214_R108_{}_{}'.format(stamp, TILE_ID, stamp)
+    product_path = os.path.join(raw_directory, product_name + '.SAFE')
+    granule = 'L2A_{}_A000000_{}'.format(TILE_ID, stamp)
+    image_directory = os.path.join(product_path, 'GRANULE', granule, 'IMG_DATA')
+
+    fields = field_pattern(size, size, field_size, rng)
+    for band in bands:
+        resolution_name, resolution = Sentinel2Specs.band_resolution[band]
+        factor = resolution // 10
+        band_size = size // factor
+        if band == 'SCL':
+            img = rng.choice(SCENE_CLASSES, size=(band_size, band_size),
+                             p=SCENE_CLASS_PROBABILITIES).astype('uint8')
+        else:
+            field_values = rng.integers(200, 4000, size=fields.max() + 1)
+            img = field_values[fields[::factor, ::factor]] + rng.normal(0, 50, size=(band_size, band_size))
+            img = np.clip(img, 0, 10000).astype('uint16')
+
+        band_directory = os.path.join(image_directory, resolution_name)
+        os.makedirs(band_directory, exist_ok=True)
+        path = os.path.join(band_directory, '{}_{}_{}_{}m.jp2'.format(TILE_ID, stamp, band, resolution))
+        with rasterio.open(path, 'w',
+                           driver='JP2OpenJPEG',
+                           quality=100,
+                           reversible='YES',
+                           height=band_size,
+                           width=band_size,
+                           count=1,
+                           dtype=img.dtype,
+                           crs=TILE_CRS,
+                           transform=from_origin(*TILE_ORIGIN, resolution, resolution)) as dest:
+            dest.write(img, 1)
+    return product_path
+
+
+def create_safe_products(raw_directory, num_products=3, size=512, seed=0):
+    """Create a time series of synthetic SAFE products, one every five days."""
+    start = datetime.datetime(2020, 5, 1, 10, 30, 31)
+    return [create_safe_product(raw_directory,
+                                sensing_time=start + datetime.timedelta(days=5 * i),
+                                size=size,
+                                seed=seed + i)
+            for i in range(num_products)]
+
+
+def tile_bounds(size, margin=0.1):
+    """Get bounds of a synthetic tile in EPSG:4326 shrunk by a relative margin."""
+    extent = size * 10
+    x_min, y_max = TILE_ORIGIN
+    points = gpd.GeoSeries([Point(x_min + margin * extent, y_max - (1 - margin) * extent),
+                            Point(x_min + (1 - margin) * extent, y_max - margin * extent)],
+                           crs=TILE_CRS).to_crs('EPSG:4326')
+    return points.total_bounds
+
+
+def to_dms(value):
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = round((value - degrees - minutes / 60) * 3600, 2)
+    return (IFDRational(degrees, 1), IFDRational(minutes, 1), IFDRational(int(seconds * 100), 100))
+
+
+def create_geotagged_jpeg(path, lon, lat, direction, date='2020:06:01', size=(640, 480), seed=0):
+    """Create a jpeg with random content and iOS like GPS exif tags."""
+    rng = np.random.default_rng(seed)
+    image = Image.fromarray(rng.integers(0, 255, size=(size[1], size[0], 3), dtype='uint8'))
+
+    exif = image.getexif()
+    gps = exif.get_ifd(0x8825)
+    gps[GPS_TAGS['GPSLatitudeRef']] = 'N' if lat >= 0 else 'S'
+    gps[GPS_TAGS['GPSLatitude']] = to_dms(abs(lat))
+    gps[GPS_TAGS['GPSLongitudeRef']] = 'E' if lon >= 0 else 'W'
+    gps[GPS_TAGS['GPSLongitude']] = to_dms(abs(lon))
+    gps[GPS_TAGS['GPSImgDirection']] = IFDRational(int(direction * 100), 100)
+    gps[GPS_TAGS['GPSDateStamp']] = date
+    image.save(path, format='JPEG', exif=exif)
+    return path
+
+
+def create_geotagged_jpegs(photo_directory, num_photos, bounds, seed=0):
+    """Create geotagged jpegs at random positions within bounds (EPSG:4326)."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(photo_directory, exist_ok=True)
+    paths = []
+    for i in range(num_photos):
+        lon = rng.uniform(bounds[0], bounds[2])
+        lat = rng.uniform(bounds[1], bounds[3])
+        path = os.path.join(photo_directory, 'IMG_{:04d}.jpeg'.format(i))
+        paths.append(create_geotagged_jpeg(path, lon, lat, direction=rng.uniform(0, 360), seed=seed + i))
+    return paths
+
+
+def create_segments_raster(path, size=512, segment_size=32, seed=0):
+    """Create a GeoTiff of rectangular segments on the synthetic tile grid."""
+    segments = field_pattern(size, size, segment_size, np.random.default_rng(seed)).astype('uint32')
+    with rasterio.open(path, 'w',
+                       driver='GTiff',
+                       height=size,
+                       width=size,
+                       count=1,
+                       dtype=segments.dtype,
+                       crs=TILE_CRS,
+                       transform=from_origin(*TILE_ORIGIN, 10, 10)) as dest:
+        dest.write(segments, 1)
+    return path
+
+
+def classified_sample_points(num_samples, size=512, seed=0):
+    """Create classified crop photo samples within the synthetic tile (EPSG:32632)."""
+    rng = np.random.default_rng(seed)
+    extent = size * 10
+    x = TILE_ORIGIN[0] + rng.uniform(0, extent, size=num_samples)
+    y = TILE_ORIGIN[1] - rng.uniform(0, extent, size=num_samples)
+    crops = rng.choice(['Zea mays', 'Triticum aestivum', 'Brassica napus'], size=num_samples)
+    scores = rng.uniform(0.1, 0.95, size=num_samples)
+    return gpd.GeoDataFrame({'sampleID': np.arange(1, num_samples + 1),
+                             'classification_tag_1': crops,
+                             'classification_score_1': scores},
+                            crs=TILE_CRS,
+                            geometry=[Point(xy) for xy in zip(x, y)])
@@ -79,7 +79,7 @@ class CropPhotoSamples():
                     print('Dropping duplicate file ' + row['filename'])
                     new_samples = new_samples.drop(idx, axis=0)
             new_samples['sampleID'] = np.arange(new_sample_id, len(new_samples) + 1)
-            self.samples = self.samples.append(new_samples)
+            self.samples = pd.concat([self.samples, new_samples])
 
         return self
 
@@ -1,4 +1,5 @@
 import rasterio
+import rasterio.features
 import pandas as pd
 import geopandas as gpd
 import numpy as np
@@ -33,8 +34,7 @@ class FieldSamples():
             if f['classification_score_1'] is None or float(f['classification_score_1']) < minimum_classification_score:
                 print('Skipping index ' + str(i) + ' due to missing or too low classification score')
             else:
-                x, y = f['geometry'].coords.xy
-                segment_id = segments[segments_raster.index(x, y)]
+                segment_id = segments[segments_raster.index(f['geometry'].x, f['geometry'].y)]
                 segment = np.where(segments == segment_id, 1, 0)
                 shapes = []
                 for shp, _ in rasterio.features.shapes(segment.astype('int16'), transform=segments_raster.transform):
@@ -50,9 +50,66 @@ class FieldSamples():
         if self.samples is None:
             self.samples = new_samples
         else:
-            self.samples = self.samples.append(new_samples)
+            self.samples = pd.concat([self.samples, new_samples], ignore_index=True)
         return self
 
+    def extract_time_series(self,
+                            datacube,
+                            per_pixel=False,
+                            aggregation_function=np.nanmean):
+        """Extract Sentinel 2 time series of all field samples from a datacube.
+
+        Parameters
+        ----------
+        datacube: findus.sentinel.Sentinel2Datacube
+            Datacube, e.g. created by AOI.build_datacube().
+        per_pixel: bool
+            Whether to return the time series of every pixel instead of one aggregated
+            time series per segment.
+        aggregation_function: function
+            Function to be used to aggregate the valid pixels of a segment.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Time series in long format with one row per sample (and pixel), date and band.
+            Samples are identified by their position in FieldSamples.samples.
+            Per pixel rows carry the coordinates x, y of the pixel center in the datacube
+            coordinate system. Aggregated time series of samples outside of the datacube are
+            NaN with a valid_fraction of 0.
+        """
+        samples = self.samples.to_crs(datacube.crs)
+        dates = np.array(datacube.dates)
+        bands = np.array(datacube.bands)
+
+        if per_pixel:
+            series, valid, segment, xs, ys = datacube.segment_pixels(samples.geometry)
+            pixel, time, band = np.meshgrid(np.arange(len(segment)), np.arange(len(dates)),
+                                            np.arange(len(bands)), indexing='ij')
+            pixel, time, band = pixel.ravel(), time.ravel(), band.ravel()
+            sample = segment[pixel]
+            columns = {'x': xs[pixel],
+                       'y': ys[pixel],
+                       'date': dates[time],
+                       'band': bands[band],
+                       'value': series.ravel(),
+                       'valid': valid[pixel, time]}
+        else:
+            series, valid_fraction = datacube.segment_time_series(samples.geometry,
+                                                                  aggregation_function=aggregation_function)
+            sample, time, band = np.meshgrid(np.arange(len(samples)), np.arange(len(dates)),
+                                             np.arange(len(bands)), indexing='ij')
+            sample, time, band = sample.ravel(), time.ravel(), band.ravel()
+            columns = {'date': dates[time],
+                       'band': bands[band],
+                       'value': series.ravel(),
+                       'valid_fraction': valid_fraction[sample, time]}
+
+        data = {'sample': sample,
+                'crop': samples['crop'].values[sample]}
+        data.update(columns)
+        return pd.DataFrame(data)
+
     def save_samples(self, saving_path=None):
         if saving_path is None:
             if self.init_path is not None:
@@ -15,6 +15,11 @@ import geopandas as gpd
 from rasterio.mask import mask
 import re
 import rasterio
+import warnings
+from rasterio.errors import WindowError
+from rasterio.features import geometry_mask
+from rasterio.transform import rowcol, xy
+from rasterio.windows import Window, from_bounds
 from scipy.ndimage import zoom
 from skimage.segmentation import felzenszwalb, mark_boundaries, slic
 
@@ -54,6 +59,11 @@ def get_product_info_from_name(product_name):
     return tile_id
 
 
+def get_product_date_from_name(product_name):
+    sensing_time = re.search(r'_(\d{8}T\d{6})_', product_name).group(1)
+    return datetime.datetime.strptime(sensing_time, '%Y%m%dT%H%M%S')
+
+
 def scene_classification_to_binary_mask(scene_classification_image,
                                         target_classes=[0, 7, 8, 9, 10, 11]):
     mask = np.ones(scene_classification_image.shape)
@@ -67,6 +77,294 @@ def get_array_from_product(path):
     return img, file.meta
 
 
+def read_resampled_window(dataset, window, factor):
+    """Read a window given on the finest band grid from a (possibly coarser) band.
+
+    The window is given in pixels of the finest grid relative to the band origin. Pixels
+    of coarser bands are repeated factor times (nearest neighbour), matching
+    zoom(..., order=0). Areas outside of the band are filled with 0.
+    """
+    row_off, col_off = int(window.row_off), int(window.col_off)
+    height, width = int(window.height), int(window.width)
+    row_start, col_start = row_off // factor, col_off // factor
+    row_stop, col_stop = -(-(row_off + height) // factor), -(-(col_off + width) // factor)
+    img = np.zeros((row_stop - row_start, col_stop - col_start), dtype=dataset.dtypes[0])
+    # Read only the part inside of the band, boundless reads are considerably slower.
+    read_rows = max(row_start, 0), min(row_stop, dataset.height)
+    read_cols = max(col_start, 0), min(col_stop, dataset.width)
+    if read_rows[0] < read_rows[1] and read_cols[0] < read_cols[1]:
+        source_window = Window(read_cols[0], read_rows[0],
+                               read_cols[1] - read_cols[0], read_rows[1] - read_rows[0])
+        img[read_rows[0] - row_start:read_rows[1] - row_start,
+            read_cols[0] - col_start:read_cols[1] - col_start] = dataset.read(1, window=source_window)
+    if factor > 1:
+        img = np.repeat(np.repeat(img, factor, axis=0), factor, axis=1)
+    row_shift, col_shift = row_off - row_start * factor, col_off - col_start * factor
+    return img[row_shift:row_shift + height, col_shift:col_shift + width]
+
+
+class Sentinel2Datacube:
+    """Time series datacube of processed Sentinel 2 products.
+
+    The datacube spans the dimensions (time, band, y, x) on the grid of the finest
+    requested band. Data is not held in memory: every read opens the processed
+    products and loads only the requested window, so the cube can be consumed chunk by
+    chunk. Pixels flagged by the scene classification (SCL) are invalid and set to NaN.
+    """
+    def __init__(self,
+                 product_directories,
+                 bands=['B02', 'B03', 'B04', 'B08', 'B11'],
+                 chunk_size=(512, 512),
+                 invalid_classes=[0, 7, 8, 9, 10, 11]):
+        """Initializer.
+
+        Parameters
+        ----------
+        product_directories: List[str]
+            Directories of processed products (see AOI.process_raw_product()).
+        bands: List[str]
+            Sentinel 2 bands to be included in the datacube.
+        chunk_size: Tuple[int, int]
+            Height and width of the chunks yielded by Sentinel2Datacube.iter_chunks().
+        invalid_classes: List[int]
+            Scene classification classes marking a pixel as invalid.
+        """
+        self.bands = list(bands)
+        self.chunk_size = chunk_size
+        self.invalid_classes = invalid_classes
+
+        products = sorted(product_directories,
+                          key=lambda d: get_product_date_from_name(os.path.basename(os.path.normpath(d))))
+        self.product_directories = products
+        self.dates = [get_product_date_from_name(os.path.basename(os.path.normpath(d))) for d in products]
+
+        self.resolution = min(Sentinel2Specs.band_resolution[b][1] for b in self.bands)
+        self.factors = {b: Sentinel2Specs.band_resolution[b][1] // self.resolution
+                        for b in self.bands + ['SCL']}
+
+        # All bands are read on the grid of the finest band of the first product. Bands
+        # of other resolutions or products may be shifted by a few pixels due to cropping,
+        # hence the datacube only spans the overlap of all products.
+        reference_band = [b for b in self.bands if self.factors[b] == 1][0]
+        with rasterio.open(os.path.join(self.product_directories[0], reference_band + '.jp2')) as file:
+            self.transform = file.transform
+            self.crs = file.crs
+        heights, widths = [], []
+        for directory in self.product_directories:
+            with rasterio.open(os.path.join(directory, reference_band + '.jp2')) as file:
+                row_shift, col_shift = self._grid_shift(file)
+                heights.append(file.height - row_shift)
+                widths.append(file.width - col_shift)
+        self.height = min(heights)
+        self.width = min(widths)
+
+        self._shifts = dict()
+        self._datasets = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def shape(self):
+        """Get shape (time, band, y, x) of datacube."""
+        return len(self.dates), len(self.bands), self.height, self.width
+
+    def close(self):
+        """Close all opened product files."""
+        for dataset in self._datasets.values():
+            dataset.close()
+        self._datasets = dict()
+
+    def _grid_shift(self, dataset):
+        row_shift = int(round((self.transform.f - dataset.transform.f) / self.transform.e))
+        col_shift = int(round((self.transform.c - dataset.transform.c) / self.transform.a))
+        return row_shift, col_shift
+
+    def _read_band(self, time_index, band, window):
+        key = (time_index, band)
+        if key not in self._datasets:
+            path = os.path.join(self.product_directories[time_index], band + '.jp2')
+            self._datasets[key] = rasterio.open(path, driver='JP2OpenJPEG')
+            self._shifts[key] = self._grid_shift(self._datasets[key])
+        row_shift, col_shift = self._shifts[key]
+        band_window = Window(int(window.col_off) + col_shift, int(window.row_off) + row_shift,
+                             window.width, window.height)
+        return read_resampled_window(self._datasets[key], band_window, self.factors[band])
+
+    def chunks(self):
+        """Get windows of all chunks of the datacube."""
+        chunk_height, chunk_width = self.chunk_size
+        windows = []
+        for row in range(0, self.height, chunk_height):
+            for col in range(0, self.width, chunk_width):
+                windows.append(Window(col, row,
+                                      min(chunk_width, self.width - col),
+                                      min(chunk_height, self.height - row)))
+        return windows
+
+    def read(self, window=None):
+        """Read a window of the datacube.
+
+        Parameters
+        ----------
+        window: rasterio.windows.Window
+            Window on the datacube grid. Reads the whole datacube if None.
+
+        Returns
+        -------
+        data: numpy.ndarray
+            Array of shape (time, band, y, x) with NaN for invalid pixels.
+        valid: numpy.ndarray
+            Boolean validity mask of shape (time, y, x).
+        """
+        if window is None:
+            window = Window(0, 0, self.width, self.height)
+        height, width = int(window.height), int(window.width)
+
+        data = np.empty((len(self.dates), len(self.bands), height, width), dtype='float32')
+        valid = np.empty((len(self.dates), height, width), dtype=bool)
+        for t in range(len(self.dates)):
+            scene_classification = self._read_band(t, 'SCL', window)
+            valid[t] = ~np.isin(scene_classification, self.invalid_classes)
+            for b, band in enumerate(self.bands):
+                data[t, b] = self._read_band(t, band, window)
+            data[t][:, ~valid[t]] = np.nan
+        return data, valid
+
+    def iter_chunks(self):
+        """Iterate lazily over all chunks of the datacube.
+
+        Yields
+        ------
+        window, data, valid
+            Chunk window and the corresponding output of Sentinel2Datacube.read().
+        """
+        for window in self.chunks():
+            data, valid = self.read(window)
+            yield window, data, valid
+
+    def _pixel_time_series(self, rows, cols):
+        series = np.full((len(rows), len(self.dates), len(self.bands)), np.nan, dtype='float32')
+        valid = np.zeros((len(rows), len(self.dates)), dtype=bool)
+
+        inside = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+        chunk_height, chunk_width = self.chunk_size
+        chunk_ids = np.stack([rows // chunk_height, cols // chunk_width], axis=1)
+        for chunk_row, chunk_col in np.unique(chunk_ids[inside], axis=0):
+            window = Window(chunk_col * chunk_width, chunk_row * chunk_height,
+                            min(chunk_width, self.width - chunk_col * chunk_width),
+                            min(chunk_height, self.height - chunk_row * chunk_height))
+            data, chunk_valid = self.read(window)
+            selection = inside & (chunk_ids[:, 0] == chunk_row) & (chunk_ids[:, 1] == chunk_col)
+            local_rows = rows[selection] - int(window.row_off)
+            local_cols = cols[selection] - int(window.col_off)
+            series[selection] = np.moveaxis(data[:, :, local_rows, local_cols], 2, 0)
+            valid[selection] = chunk_valid[:, local_rows, local_cols].T
+        return series, valid
+
+    def pixel_time_series(self, xs, ys):
+        """Extract time series of single pixels.
+
+        Every chunk containing at least one of the requested pixels is loaded once.
+
+        Parameters
+        ----------
+        xs, ys: List[float]
+            Coordinates of the pixels in the datacube coordinate system.
+
+        Returns
+        -------
+        series: numpy.ndarray
+            Array of shape (pixel, time, band) with NaN for invalid or outside pixels.
+        valid: numpy.ndarray
+            Boolean validity mask of shape (pixel, time).
+        """
+        rows, cols = rowcol(self.transform, xs, ys)
+        return self._pixel_time_series(np.atleast_1d(rows), np.atleast_1d(cols))
+
+    def _segment_indices(self, geometry):
+        window = from_bounds(*geometry.bounds, transform=self.transform)
+        row_start, col_start = int(np.floor(window.row_off)), int(np.floor(window.col_off))
+        row_stop = int(np.ceil(window.row_off + window.height))
+        col_stop = int(np.ceil(window.col_off + window.width))
+        window = Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+        try:
+            window = window.intersection(Window(0, 0, self.width, self.height))
+        except WindowError:
+            # Segment outside of the datacube.
+            return np.empty(0, dtype=int), np.empty(0, dtype=int)
+        inside = ~geometry_mask([geometry],
+                                out_shape=(int(window.height), int(window.width)),
+                                transform=rasterio.windows.transform(window, self.transform))
+        rows, cols = np.nonzero(inside)
+        return rows + int(window.row_off), cols + int(window.col_off)
+
+    def segment_pixels(self, geometries):
+        """Extract time series of all pixels covered by segments.
+
+        The pixels of all segments are extracted together, so every chunk is loaded once.
+
+        Parameters
+        ----------
+        geometries: List[shapely.geometry.Polygon]
+            Segment boundaries in the datacube coordinate system.
+
+        Returns
+        -------
+        series: numpy.ndarray
+            Array of shape (pixel, time, band) with NaN for invalid pixels.
+        valid: numpy.ndarray
+            Boolean validity mask of shape (pixel, time).
+        segment: numpy.ndarray
+            Index of the segment (in geometries) each pixel belongs to.
+        xs, ys: numpy.ndarray
+            Coordinates of the pixel centers.
+        """
+        indices = [self._segment_indices(geometry) for geometry in geometries]
+        rows = np.concatenate([r for r, _ in indices] + [np.empty(0, dtype=int)])
+        cols = np.concatenate([c for _, c in indices] + [np.empty(0, dtype=int)])
+        segment = np.repeat(np.arange(len(indices)), [len(r) for r, _ in indices])
+
+        series, valid = self._pixel_time_series(rows, cols)
+        xs, ys = xy(self.transform, rows, cols)
+        return series, valid, segment, np.asarray(xs), np.asarray(ys)
+
+    def segment_time_series(self, geometries, aggregation_function=np.nanmean):
+        """Extract the aggregated time series of segments.
+
+        Parameters
+        ----------
+        geometries: List[shapely.geometry.Polygon]
+            Segment boundaries in the datacube coordinate system.
+        aggregation_function: function
+            Function to be used to aggregate all valid pixels of a segment.
+
+        Returns
+        -------
+        series: numpy.ndarray
+            Array of shape (segment, time, band). Segments outside of the datacube are NaN.
+        valid_fraction: numpy.ndarray
+            Fraction of valid segment pixels of shape (segment, time).
+        """
+        pixel_series, pixel_valid, segment, _, _ = self.segment_pixels(geometries)
+        series = np.full((len(geometries), len(self.dates), len(self.bands)), np.nan, dtype='float32')
+        valid_fraction = np.zeros((len(geometries), len(self.dates)))
+
+        boundaries = np.searchsorted(segment, np.arange(1, len(geometries)))
+        with warnings.catch_warnings():
+            # Dates without any valid pixel are expected and result in NaN.
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            for i, (data, valid) in enumerate(zip(np.split(pixel_series, boundaries),
+                                                  np.split(pixel_valid, boundaries))):
+                if len(data) > 0:
+                    series[i] = aggregation_function(data, axis=0)
+                    valid_fraction[i] = valid.mean(axis=0)
+        return series, valid_fraction
+
+
 class AOI:
     """Area of Interest.
 
@@ -173,7 +471,8 @@ class AOI:
 
     def process_raw_product(self,
                             path,
-                            import_bands=['B02', 'B03', 'B04', 'B08', 'B11', 'SCL']):
+                            import_bands=['B02', 'B03', 'B04', 'B08', 'B11', 'SCL'],
+                            block_size=256):
         """Process downloaded, raw Sentinel 2 products.
 
         Parameters
@@ -182,6 +481,9 @@ class AOI:
             Path to product.
         import_bands: List[str]
             List which specified which Sentinel 2 bands should be imported.
+        block_size: int
+            Tile size of the exported images. Windowed reads, e.g. of Sentinel2Datacube
+            chunks, only decode the tiles they intersect.
         """
 
         self.target_bands = [b for b in import_bands if b != 'SCL']
@@ -205,25 +507,33 @@ class AOI:
             out_meta.update({"driver": "JP2OpenJPEG",
                              "height": out_img.shape[1],
                              "width": out_img.shape[2],
-                             "transform": out_transform})
+                             "transform": out_transform,
+                             "blockxsize": block_size,
+                             "blockysize": block_size,
+                             # Lossless, the JP2OpenJPEG defaults alter e.g. SCL classes.
+                             "quality": 100,
+                             "reversible": "YES"})
 
             export_path = os.path.join(export_directory, b + '.jp2')
             with rasterio.open(export_path, "w", **out_meta) as dest:
                 dest.write(out_img)
 
     def start_raw_product_processing(self,
-                                     import_bands=['B02', 'B03', 'B04', 'B08', 'B11', 'SCL']):
+                                     import_bands=['B02', 'B03', 'B04', 'B08', 'B11', 'SCL'],
+                                     block_size=256):
         """Start processing of downloaded, raw products.
 
         Parameters
         ----------
         import_bands: List[str]
             List which specified which Sentinel 2 bands should be imported.
+        block_size: int
+            Tile size of the exported images.
         """
         print("Start processing of raw products.")
         for p in tqdm(os.listdir(self.raw_data_directory)):
             self.process_raw_product(path=os.path.join(
-                self.raw_data_directory, p), import_bands=import_bands)
+                self.raw_data_directory, p), import_bands=import_bands, block_size=block_size)
 
     def combine_processed_products(self, combination_function=np.nanmean):
         """Combine processed products to one image.
@@ -269,6 +579,40 @@ class AOI:
                 self.combined_imgs[key] = combination_function(np.array(masked_imgs[key]), axis=0)
             self.combined_imgs['meta'] = meta
 
+    def build_datacube(self,
+                       bands=None,
+                       chunk_size=(512, 512)):
+        """Build a time series datacube from all processed products.
+
+        As alternative to AOI.combine_processed_products(), every product is kept as its
+        own time step instead of being combined into one composite.
+
+        Parameters
+        ----------
+        bands: List[str]
+            Sentinel 2 bands to be included. Defaults to the target bands of the AOI or, if
+            not set, all bands of the processed products.
+        chunk_size: Tuple[int, int]
+            Height and width of the datacube chunks.
+
+        Returns
+        -------
+        findus.sentinel.Sentinel2Datacube
+            Datacube keeping product files open until closed, preferably used as context
+            manager.
+        """
+        product_directories = [os.path.join(self.processed_data_directory, p)
+                               for p in os.listdir(self.processed_data_directory)]
+        if bands is None:
+            bands = self.target_bands
+        if bands is None:
+            # AOI reopened without processing products in this session.
+            files = os.listdir(product_directories[0])
+            bands = [b for b in Sentinel2Specs.band_resolution if b != 'SCL' and b + '.jp2' in files]
+        return Sentinel2Datacube(product_directories=product_directories,
+                                 bands=bands,
+                                 chunk_size=chunk_size)
+
     def perform_image_segmentation(self,
                                    n_segments=500,
                                    compactness=15,
@@ -288,7 +632,7 @@ class AOI:
         # TODO extent for multi band segmentation
         image = self.combined_imgs[band]
         image[np.isnan(image)] = 0
-        segments = slic(image=image, n_segments=n_segments, compactness=compactness)
+        segments = slic(image=image, n_segments=n_segments, compactness=compactness, channel_axis=None)
         self.segments = segments
         segments = segments.astype('uint32')
         segments = np.expand_dims(segments, 0)
@@ -32,18 +32,23 @@ setup(
         'Programming Language :: Python :: 3.7',
     ],
 
-    packages=find_packages(exclude=['contrib', 'docs', 'tests']),
+    packages=find_packages(exclude=['contrib', 'docs', 'tests', 'benchmarks']),
 
     install_requires=['numpy',
                       'shapely',
                       'geopandas',
                       'rasterio',
+                      'affine<3',
                       'matplotlib',
                       'pandas',
-                      'sklearn',
+                      'scikit-learn',
                       'requests',
                       'sentinelsat',
-                      'skimage',
+                      'scikit-image>=0.19',
                       'scipy',
                       'tqdm'],
+
+    extras_require={
+        'benchmark': ['pytest', 'pytest-benchmark', 'Pillow'],
+    },
 )